@@ -1,34 +1,142 @@
+import ast
+import itertools
 import logging
 import json
+import math
 import requests
+from requests.adapters import HTTPAdapter
 from boto3 import client
 from botocore.exceptions import ClientError
 import os
+import random
 import time
-from typing import Dict, Tuple, Any
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field, replace
+from typing import Callable, Dict, List, Optional, Tuple, Any
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the standard library
+    orjson = None
 
 # Constants
 GLOBAL_SECURITI_URL = "https://app.securiti.ai"
 TIMEOUT = int(os.getenv("TIMEOUT", 30))
 RETRIES = int(os.getenv("RETRIES", 3))
+SECRET_CACHE_TTL = int(os.getenv("SECRET_CACHE_TTL", 600))
+MAX_WORKERS = int(os.getenv("MAX_WORKERS", 8))
+POLL_TIMEOUT = float(os.getenv("POLL_TIMEOUT", 15))
+LAMBDA_NAME = os.getenv("AWS_LAMBDA_FUNCTION_NAME", "default_lambda")
+
+
+def dump_json(data: Any) -> bytes:
+    """Serializes data to JSON bytes, using orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data).encode()
+
+
+def load_json(data: str) -> Any:
+    """Parses a JSON document, using orjson when available."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON line, serializing the structured log entry only on emit."""
 
-# Logger configuration
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "timestamp": self.formatTime(record),
+            "logger": record.name,
+            "level": record.levelname,
+        }
+        aws_request_id = getattr(record, "aws_request_id", None)
+        if aws_request_id:
+            data["aws_request_id"] = aws_request_id
+        log_entry = getattr(record, "log_entry", None)
+        if log_entry is not None:
+            data.update(log_entry)
+        else:
+            data["message"] = record.getMessage()
+        if record.exc_info:
+            data["exception"] = self.formatException(record.exc_info)
+        return dump_json(data).decode()
+
+
+# Logger configuration (the Lambda runtime installs its own handler, so the
+# formatter is applied to every handler of the root logger)
 logger = logging.getLogger()
 if not logger.handlers:
-    handler = logging.StreamHandler()
-    formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    )
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
-logger.setLevel(logging.INFO)
+    logger.addHandler(logging.StreamHandler())
+for handler in logger.handlers:
+    handler.setFormatter(JsonFormatter())
+log_level = logging.getLevelName(os.getenv("LOG_LEVEL", "INFO").upper())
+if not isinstance(log_level, int):  # unknown level name, keep the default
+    log_level = logging.INFO
+logger.setLevel(log_level)
+
+LOG_LEVELS = {
+    "info": logging.INFO,
+    "warning": logging.WARNING,
+    "error": logging.ERROR,
+}
+
+# AWS clients (created once per container and reused across invocations)
+sm_client = client(service_name="secretsmanager", region_name="us-east-1")
+
+# HTTP session (keeps TLS connections alive between requests). The per-host pool
+# must hold at least one connection per subtask worker, otherwise connections
+# opened by concurrent workers are discarded instead of being reused.
+session = requests.Session()
+session.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=4, pool_maxsize=max(16, MAX_WORKERS), max_retries=0
+    ),
+)
 
 # Global variables
-data_dsr = {}
-data_subtask = {}
+secret_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+
+@dataclass
+class RequestContext:
+    """Holds the state of a single DSR request (and optionally one of its subtasks)."""
+
+    lambda_name: str = "unknown"
+    enviroment: str = "unknown"
+    form_title: str = "unknown"
+    ticket_id: str = "unknown"
+    task_subtask: List[Dict[str, Any]] = field(default_factory=list)
+    secrets_header: Dict[str, Any] = field(default_factory=dict)
+    google_chat: Optional[str] = None
+    microsoft_teams: Optional[str] = None
+    subtask: Optional[Dict[str, Any]] = None
+    teams_template: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = field(
+        default=None, repr=False
+    )
+    google_chat_template: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = field(
+        default=None, repr=False
+    )
+    log_base: Dict[str, Any] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        # Fields shared by every log entry of this request/subtask.
+        self.log_base = {
+            "lambda_name": self.lambda_name,
+            "enviroment": self.enviroment,
+            "form_title": self.form_title,
+            "ticket_id": self.ticket_id,
+            "task_id": safe_get(self.subtask, "task_id"),
+            "subtask_id": safe_get(self.subtask, "subtask_id"),
+            "subtask_title": safe_get(self.subtask, "title"),
+        }
 
 
 def log_event(
+    ctx: RequestContext,
     level: str,
     event: str,
     status: str,
@@ -36,14 +144,31 @@ def log_event(
     **kwargs,
 ):
     """Logs an event with the specified level and details."""
-    log_entry = create_log_entry(event, status, message, **kwargs)
-    log_message = json.dumps(log_entry)
-    if level == "info":
-        logger.info(log_message)
-    elif level == "warning":
-        logger.warning(log_message)
-    elif level == "error":
-        logger.error(log_message)
+    level_num = LOG_LEVELS.get(level, logging.INFO)
+    if not logger.isEnabledFor(level_num):
+        return
+    log_entry = create_log_entry(ctx, event, status, message, **kwargs)
+    logger.log(level_num, event, extra={"log_entry": log_entry})
+
+
+class JsonLiteralTransformer(ast.NodeTransformer):
+    """Rewrites the JSON literals true/false/null into Python constants."""
+
+    LITERALS = {"true": True, "false": False, "null": None}
+
+    def visit_Name(self, node: ast.Name) -> ast.AST:
+        if node.id in self.LITERALS:
+            return ast.copy_location(ast.Constant(self.LITERALS[node.id]), node)
+        return node
+
+
+def parse_event_data(raw: str) -> Dict[str, Any]:
+    """Parses the event data, accepting JSON and (possibly single-quoted) dict literals."""
+    try:
+        return load_json(raw)
+    except json.JSONDecodeError:
+        tree = ast.parse(raw.lstrip(" \t"), mode="eval")
+        return ast.literal_eval(JsonLiteralTransformer().visit(tree))
 
 
 def safe_get(data, key, default="unknown"):
@@ -52,120 +177,125 @@ def safe_get(data, key, default="unknown"):
     return data.get(key, default)
 
 
+def get_backoff_delay(attempt: int, base: float = 1.0, cap: float = 30.0) -> float:
+    """Returns an exponential backoff delay (in seconds) with jitter."""
+    return min(cap, base * (2**attempt)) * (0.5 + random.random() * 0.5)
+
+
+def get_retry_delay(
+    response: requests.Response, attempt: int, cap: float = 30.0
+) -> float:
+    """Returns the delay before retrying a failed request, honoring Retry-After on 429."""
+    if response.status_code == 429:
+        try:
+            retry_after = float(response.headers["Retry-After"])
+        except (KeyError, ValueError):
+            retry_after = math.nan
+        if math.isfinite(retry_after):
+            return min(max(retry_after, 0.0), cap)
+    return get_backoff_delay(attempt, cap=cap)
+
+
 def create_log_entry(
+    ctx: RequestContext,
     event: str,
     status: str,
     message: str,
     **kwargs,
 ) -> Dict[str, Any]:
     """Creates a log entry dictionary."""
-    log_entry = {
-        "event": event,
-        "status": status,
-        "lambda_name": safe_get(data_dsr, "lambda_name"),
-        "enviroment": safe_get(data_dsr, "enviroment"),
-        "form_title": safe_get(data_dsr, "dsp_form_title"),
-        "ticket_id": safe_get(data_dsr, "ticketId"),
-        "task_id": safe_get(data_subtask, "task_id"),
-        "subtask_id": safe_get(data_subtask, "subtask_id"),
-        "subtask_title": safe_get(data_subtask, "title"),
-        "message": message,
-    }
+    log_entry = {"event": event, "status": status, **ctx.log_base, "message": message}
     log_entry.update(kwargs)
     return log_entry
 
 
-def format_teams_notification(log_entry: Dict[str, Any]) -> Dict[str, Any]:
-    """Formats a Microsoft Teams notification."""
-    body = [
-        {
-            "type": "TextBlock",
-            "text": f"**Lambda:** {log_entry['lambda_name']}",
-            "wrap": True,
-            "fontType": "Monospace",
-        },
-        {
-            "type": "TextBlock",
-            "text": f"**Ambiente:** {log_entry['enviroment']}",
-            "wrap": True,
-            "fontType": "Monospace",
-        },
-        {
-            "type": "TextBlock",
-            "text": f"**Formulário:** {log_entry['form_title']}",
-            "wrap": True,
-            "fontType": "Monospace",
-        },
-        {
-            "type": "TextBlock",
-            "text": f"**Ticket ID:** {log_entry['ticket_id']}",
-            "wrap": True,
-            "fontType": "Monospace",
-        },
-        {
-            "type": "TextBlock",
-            "text": f"**Tarefa ID:** {log_entry['task_id']}",
-            "wrap": True,
-            "fontType": "Monospace",
-        },
-        {
-            "type": "TextBlock",
-            "text": f"**Subtask ID:** {log_entry['subtask_id']}",
-            "wrap": True,
-            "fontType": "Monospace",
-        },
-        {
-            "type": "TextBlock",
-            "text": f"**Nome da Subtarefa:** {log_entry['subtask_title']}",
-            "wrap": True,
-            "fontType": "Monospace",
-        },
+def teams_text_block(text: str) -> Dict[str, Any]:
+    """Creates a Microsoft Teams TextBlock element."""
+    return {"type": "TextBlock", "text": text, "wrap": True, "fontType": "Monospace"}
+
+
+def build_teams_template(
+    ctx: RequestContext,
+) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """Builds a Microsoft Teams notification formatter with the request fields pre-filled."""
+    request_body = [
+        teams_text_block(f"**Lambda:** {ctx.lambda_name}"),
+        teams_text_block(f"**Ambiente:** {ctx.enviroment}"),
+        teams_text_block(f"**Formulário:** {ctx.form_title}"),
+        teams_text_block(f"**Ticket ID:** {ctx.ticket_id}"),
+    ]
+    actions = [
         {
-            "type": "TextBlock",
-            "text": f"**Mensagem:** {log_entry['message']}",
-            "wrap": True,
-            "fontType": "Monospace",
-        },
+            "type": "Action.OpenUrl",
+            "title": "Visualizar na Securiti",
+            "url": f"{GLOBAL_SECURITI_URL}/#/ticket-details/{ctx.ticket_id}?tab=WORKLIST",
+        }
     ]
 
-    return {
-        "type": "message",
-        "attachments": [
-            {
-                "contentType": "application/vnd.microsoft.card.adaptive",
-                "content": {
-                    "$schema": "http://adaptivecards.io/schemas/adaptive-card.json",
-                    "type": "AdaptiveCard",
-                    "version": "1.0",
-                    "body": body,
-                    "actions": [
-                        {
-                            "type": "Action.OpenUrl",
-                            "title": "Visualizar na Securiti",
-                            "url": f"{GLOBAL_SECURITI_URL}/#/ticket-details/{log_entry['ticket_id']}?tab=WORKLIST",
-                        }
-                    ],
-                },
-            }
-        ],
-    }
+    def format_teams_notification(log_entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Formats a Microsoft Teams notification."""
+        body = request_body + [
+            teams_text_block(f"**Tarefa ID:** {log_entry['task_id']}"),
+            teams_text_block(f"**Subtask ID:** {log_entry['subtask_id']}"),
+            teams_text_block(f"**Nome da Subtarefa:** {log_entry['subtask_title']}"),
+            teams_text_block(f"**Mensagem:** {log_entry['message']}"),
+        ]
+
+        return {
+            "type": "message",
+            "attachments": [
+                {
+                    "contentType": "application/vnd.microsoft.card.adaptive",
+                    "content": {
+                        "$schema": "http://adaptivecards.io/schemas/adaptive-card.json",
+                        "type": "AdaptiveCard",
+                        "version": "1.0",
+                        "body": body,
+                        "actions": actions,
+                    },
+                }
+            ],
+        }
+
+    return format_teams_notification
+
+
+def post_json(
+    url: str, payload: Any, headers: Optional[Dict[str, Any]] = None, **kwargs
+) -> requests.Response:
+    """Posts a JSON payload through the shared session, encoded with dump_json."""
+    return session.post(
+        url,
+        headers={**(headers or {}), "Content-Type": "application/json"},
+        data=dump_json(payload),
+        **kwargs,
+    )
+
 
+def get_secret(ctx: RequestContext, secret: str) -> Dict[str, Any]:
+    """Fetch secrets from AWS Secrets Manager, reusing cached values on warm starts."""
+    now = time.monotonic()
+    cached = secret_cache.get(secret)
+    if cached and now - cached[0] < SECRET_CACHE_TTL:
+        return cached[1]
 
-def get_secret(secret: str) -> Dict[str, Any]:
-    """Fetch secrets from AWS Secrets Manager."""
-    log_event("info", "collecting_secrets", "started", message="Collecting secrets")
-    sm = client(service_name="secretsmanager", region_name="us-east-1")
+    log_event(
+        ctx, "info", "collecting_secrets", "started", message="Collecting secrets"
+    )
     try:
-        get_secret_value_response = sm.get_secret_value(SecretId=secret)
-        secret_data = json.loads(get_secret_value_response["SecretString"])
-        log_event("info", "collecting_secrets", "success", message="Secrets collected")
+        get_secret_value_response = sm_client.get_secret_value(SecretId=secret)
+        secret_data = load_json(get_secret_value_response["SecretString"])
+        secret_cache[secret] = (now, secret_data)
+        log_event(
+            ctx, "info", "collecting_secrets", "success", message="Secrets collected"
+        )
         return secret_data
     except ClientError as err:
-        log_event("error", "collecting_secrets", "error", message=str(err))
+        log_event(ctx, "error", "collecting_secrets", "error", message=str(err))
         raise RuntimeError("Failed to retrieve secrets") from err
 
 
-def was_subtask_removed(secrets: Dict[str, Any]) -> Tuple[bool, str]:
+def was_subtask_removed(ctx: RequestContext) -> Tuple[bool, str]:
     """Verifies if the subtask was removed."""
     url = f"{GLOBAL_SECURITI_URL}/reporting/v1/sources/query"
     payload = {
@@ -176,29 +306,33 @@ def was_subtask_removed(secrets: Dict[str, Any]) -> Tuple[bool, str]:
         "filter": {
             "op": "and",
             "value": [
-                {"op": "eq", "field": "id", "value": data_dsr["ticketId"]},
-                {"op": "eq", "field": "task_id", "value": data_subtask["task_id"]},
+                {"op": "eq", "field": "id", "value": ctx.ticket_id},
+                {"op": "eq", "field": "task_id", "value": ctx.subtask["task_id"]},
             ],
         },
     }
     try:
-        response = requests.post(
-            url=url,
-            headers=secrets,
+        response = post_json(
+            url,
+            payload,
+            headers=ctx.secrets_header,
             params={"ref": "getListOfTasks"},
-            json=payload,
             timeout=TIMEOUT,
         )
         if response.status_code != 200:
             log_event(
+                ctx,
                 "error",
                 "was_subtask_removed",
                 "http_error",
                 f"Status: {response.status_code} - Response: {response.text}",
             )
             return False, response.text
-        elif (response.json())["data"][0].get("total_subtasks", 0) == 1:
+
+        body = response.json()
+        if body["data"][0].get("total_subtasks", 0) == 1:
             log_event(
+                ctx,
                 "info",
                 "was_subtask_removed",
                 "success",
@@ -206,15 +340,18 @@ def was_subtask_removed(secrets: Dict[str, Any]) -> Tuple[bool, str]:
             )
             return True, ""
         else:
+            # Expected while polling; update_subtask logs the final failure.
             log_event(
-                "error",
+                ctx,
+                "info",
                 "was_subtask_removed",
-                "error",
-                f"Subtask was not removed. Response data: {response.json()}",
+                "not_removed",
+                f"Subtask was not removed yet. Response data: {body}",
             )
             return False, response.text
     except requests.exceptions.Timeout:
         log_event(
+            ctx,
             "warning",
             "was_subtask_removed",
             "timeout",
@@ -223,6 +360,7 @@ def was_subtask_removed(secrets: Dict[str, Any]) -> Tuple[bool, str]:
         return False, "Processing timeout"
     except requests.exceptions.RequestException as err:
         log_event(
+            ctx,
             "error",
             "was_subtask_removed",
             "exception",
@@ -231,51 +369,65 @@ def was_subtask_removed(secrets: Dict[str, Any]) -> Tuple[bool, str]:
         return False, str(err)
 
 
-def update_subtask() -> Tuple[bool, str]:
+def update_subtask(ctx: RequestContext) -> Tuple[bool, str]:
     """Updates the status of a subtask using the API with additional verification."""
-    update_url = f"{GLOBAL_SECURITI_URL}/privaci/v1/admin/dsr/subtasks/{data_subtask['subtask_id']}/response/"
+    update_url = f"{GLOBAL_SECURITI_URL}/privaci/v1/admin/dsr/subtasks/{ctx.subtask['subtask_id']}/response/"
     body = {"status": 5}
     error = ""
     for attempt in range(RETRIES):
+        delay = get_backoff_delay(attempt)
         try:
             log_event(
+                ctx,
                 "info",
                 "update_subtask",
                 "started",
                 f"attempt: {attempt+1}",
             )
-            response = requests.post(
-                url=update_url,
-                headers=data_dsr["secrets_header"],
-                json=body,
+            response = post_json(
+                update_url,
+                body,
+                headers=ctx.secrets_header,
                 timeout=TIMEOUT,
             )
             if response.status_code == 200:
-                if response.json().get("status") == 0:
+                api_status = response.json().get("status")
+                if api_status == 0:
                     log_event(
+                        ctx,
                         "info",
                         "subtask_update",
                         "started",
                         "Process started",
                     )
-                    for check_attempt in range(RETRIES):
-                        success, error = was_subtask_removed(data_dsr["secrets_header"])
+                    # Poll right away and then at growing intervals, so fast
+                    # removals return quickly while the total wait stays bounded.
+                    deadline = time.monotonic() + POLL_TIMEOUT
+                    for check_attempt in itertools.count():
+                        success, error = was_subtask_removed(ctx)
                         if success:
                             log_event(
+                                ctx,
                                 "info",
                                 "subtask_removed",
                                 "success",
                                 "Subtask successfully removed",
                             )
                             return True, ""
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
                         log_event(
+                            ctx,
                             "info",
                             "subtask_not_removed",
                             "retry",
                             f"Update Subtask - retry_attempt: {check_attempt + 1}",
                         )
-                        time.sleep(5)
+                        delay = get_backoff_delay(check_attempt, base=0.1, cap=5.0)
+                        time.sleep(min(remaining, delay))
                     log_event(
+                        ctx,
                         "error",
                         "subtask_not_removed",
                         "failure",
@@ -284,99 +436,177 @@ def update_subtask() -> Tuple[bool, str]:
                     error = "Subtask not removed after retries."
                     return False, error
                 else:
-                    error = f"API returned unexpected status: {response.json().get('status')}"
-                    log_event("error", "subtask_update", "error", error)
+                    error = f"API returned unexpected status: {api_status}"
+                    log_event(ctx, "error", "subtask_update", "error", error)
                     return False, error
             else:
                 error = f"Error updating subtask. Status code: {response.status_code}. Response: {response.text}"
                 log_event(
+                    ctx,
                     "error",
                     "subtask_update",
                     "http_error",
                     f"status code: {response.status_code} - response: {response.text}",
                 )
+                delay = get_retry_delay(response, attempt)
         except requests.exceptions.Timeout:
-            log_event("error", "subtask_update", "timeout", "Timeout")
+            error = "Timeout"
+            log_event(ctx, "error", "subtask_update", "timeout", error)
         except requests.exceptions.RequestException as err:
-            log_event("error", "subtask_update", "exception", str(err))
+            log_event(ctx, "error", "subtask_update", "exception", str(err))
             return False, str(err)
 
-    log_event("error", "subtask_update", "failure", "All retries failed.")
+        if attempt + 1 < RETRIES:
+            time.sleep(delay)
+
+    log_event(
+        ctx,
+        "error",
+        "subtask_update",
+        "failure",
+        "All retries failed.",
+    )
     return False, error
 
 
-def process_subtasks():
-    """Processes each subtask individually and only sends notifications for definitive failures."""
-    for subtask in data_dsr["task_subtask"]:
-        global data_subtask
-        data_subtask = subtask
-        log_event("info", "update_subtask", "started", "Subtask update started")
+def process_subtask(ctx: RequestContext) -> Tuple[bool, str]:
+    """Updates a single subtask."""
+    log_event(
+        ctx,
+        "info",
+        "update_subtask",
+        "started",
+        "Subtask update started",
+    )
+    return update_subtask(ctx)
+
+
+def process_subtasks(ctx: RequestContext):
+    """Processes all subtasks concurrently and sends a notification for each definitive failure."""
+    subtasks = ctx.task_subtask
+    if not subtasks:
+        return True
+
+    all_succeeded = True
+    with ThreadPoolExecutor(max_workers=min(MAX_WORKERS, len(subtasks))) as executor:
+        futures = {}
+        for subtask in subtasks:
+            subtask_ctx = replace(ctx, subtask=subtask)
+            futures[executor.submit(process_subtask, subtask_ctx)] = subtask_ctx
+
+        for future in as_completed(futures):
+            success, reason = future.result()
+
+            if not success:
+                all_succeeded = False
+                subtask_ctx = futures[future]
+                log_event(subtask_ctx, "error", "subtask_update", "failed", reason)
+                message = create_log_entry(
+                    subtask_ctx,
+                    event="subtask_update",
+                    status="failed",
+                    message=reason,
+                )
+                send_notifications(subtask_ctx, message)
+
+    return all_succeeded
+
 
-        success, reason = update_subtask()
+def build_google_chat_template(
+    ctx: RequestContext,
+) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """Builds a Google Chat notification formatter with the request fields pre-filled."""
+    url = f"{GLOBAL_SECURITI_URL}/#/ticket-details/{ctx.ticket_id}?tab=WORKLIST"
+    request_text = (
+        f"<b>Lambda:</b> {ctx.lambda_name}<br>"
+        f"<b>Ambiente:</b> {ctx.enviroment}<br>"
+        f"<b>Formulário:</b> {ctx.form_title}<br>"
+    )
+    link_text = f"<b>Link para o Ticket:</b> <a href='{url}'>Visualizar na Securiti</a>"
 
-        if not success:
-            log_event("error", "subtask_update", "failed", reason)
-            message = create_log_entry(
-                event="subtask_update",
-                status="failed",
-                message=reason,
-            )
-            send_teams_notification(message)
-            send_google_chat_notification(message)
-            return False
-
-    return True
-
-
-def format_google_chat_notification(log_entry: Dict[str, Any]) -> Dict[str, Any]:
-    """Formats a notification for Google Chat in card format."""
-    ticket_id = log_entry["ticket_id"]
-    url = f"{GLOBAL_SECURITI_URL}/#/ticket-details/{ticket_id}?tab=WORKLIST"
-
-    return {
-        "cards": [
-            {
-                "header": {
-                    "title": "Subtask Update",
-                    "subtitle": f"Ticket ID: {log_entry['ticket_id']} | Subtask ID: {log_entry['subtask_id']}",
-                },
-                "sections": [
-                    {
-                        "widgets": [
-                            {
-                                "textParagraph": {
-                                    "text": (
-                                        f"<b>Lambda:</b> {log_entry['lambda_name']}<br>"
-                                        f"<b>Ambiente:</b> {log_entry['enviroment']}<br>"
-                                        f"<b>Formulário:</b> {log_entry['form_title']}<br>"
-                                        f"<b>Tarefa ID:</b> {log_entry['task_id']}<br>"
-                                        f"<b>Subtarefa ID:</b> {log_entry['subtask_id']}<br>"
-                                        f"<b>Nome da Subtarefa:</b> {log_entry['subtask_title']}<br>"
-                                        f"<b>Mensagem:</b> {log_entry['message']}<br>"
-                                        f"<b>Link para o Ticket:</b> <a href='{url}'>Visualizar na Securiti</a>"
-                                    )
+    def format_google_chat_notification(log_entry: Dict[str, Any]) -> Dict[str, Any]:
+        """Formats a notification for Google Chat in card format."""
+        return {
+            "cards": [
+                {
+                    "header": {
+                        "title": "Subtask Update",
+                        "subtitle": f"Ticket ID: {ctx.ticket_id} | Subtask ID: {log_entry['subtask_id']}",
+                    },
+                    "sections": [
+                        {
+                            "widgets": [
+                                {
+                                    "textParagraph": {
+                                        "text": (
+                                            f"{request_text}"
+                                            f"<b>Tarefa ID:</b> {log_entry['task_id']}<br>"
+                                            f"<b>Subtarefa ID:</b> {log_entry['subtask_id']}<br>"
+                                            f"<b>Nome da Subtarefa:</b> {log_entry['subtask_title']}<br>"
+                                            f"<b>Mensagem:</b> {log_entry['message']}<br>"
+                                            f"{link_text}"
+                                        )
+                                    }
                                 }
-                            }
-                        ]
-                    }
-                ],
-            }
-        ]
-    }
+                            ]
+                        }
+                    ],
+                }
+            ]
+        }
+
+    return format_google_chat_notification
+
+
+def post_notification(
+    ctx: RequestContext,
+    event: str,
+    url: str,
+    payload: Dict[str, Any],
+) -> Optional[requests.Response]:
+    """Posts a notification payload, retrying with backoff on 429, 5xx and request errors.
+
+    Returns the last response received, or None if every attempt raised.
+    """
+    response = None
+    for attempt in range(RETRIES):
+        try:
+            response = post_json(url, payload, timeout=TIMEOUT)
+        except requests.exceptions.RequestException as err:
+            response = None
+            log_event(
+                ctx, "warning", event, "exception", f"attempt: {attempt+1} - {err}"
+            )
+            delay = get_backoff_delay(attempt)
+        else:
+            if response.status_code != 429 and response.status_code < 500:
+                return response
+            log_event(
+                ctx,
+                "warning",
+                event,
+                "http_error",
+                f"attempt: {attempt+1} - status code: {response.status_code} - response: {response.text}",
+            )
+            delay = get_retry_delay(response, attempt)
 
+        if attempt + 1 < RETRIES:
+            time.sleep(delay)
 
-def send_google_chat_notification(log_entry: Dict[str, Any]):
+    return response
+
+
+def send_google_chat_notification(ctx: RequestContext, log_entry: Dict[str, Any]):
     """Sends a notification to Google Chat."""
-    payload = format_google_chat_notification(log_entry)
+    payload = ctx.google_chat_template(log_entry)
 
-    response = requests.post(
-        data_dsr["googleChat"],
-        headers={"Content-Type": "application/json"},
-        data=json.dumps(payload),
+    response = post_notification(
+        ctx, "send_google_chat_notification", ctx.google_chat, payload
     )
 
-    if response.status_code != 200:
+    if response is None or response.status_code != 200:
         log_event(
+            ctx,
             "error",
             "send_google_chat_notification",
             "error",
@@ -384,6 +614,7 @@ def send_google_chat_notification(log_entry: Dict[str, Any]):
         )
     else:
         log_event(
+            ctx,
             "info",
             "send_google_chat_notification",
             "success",
@@ -391,18 +622,17 @@ def send_google_chat_notification(log_entry: Dict[str, Any]):
         )
 
 
-def send_teams_notification(log_entry: Dict[str, Any]):
+def send_teams_notification(ctx: RequestContext, log_entry: Dict[str, Any]):
     """Sends a notification to Microsoft Teams."""
-    payload = format_teams_notification(log_entry)
+    payload = ctx.teams_template(log_entry)
 
-    response = requests.post(
-        data_dsr["microsoftTeams"],
-        headers={"Content-Type": "application/json"},
-        data=json.dumps(payload),
+    response = post_notification(
+        ctx, "send_teams_notification", ctx.microsoft_teams, payload
     )
 
-    if response.status_code != 202:
+    if response is None or response.status_code != 202:
         log_event(
+            ctx,
             "error",
             "send_teams_notification",
             "error",
@@ -410,6 +640,7 @@ def send_teams_notification(log_entry: Dict[str, Any]):
         )
     else:
         log_event(
+            ctx,
             "info",
             "send_teams_notification",
             "success",
@@ -417,10 +648,18 @@ def send_teams_notification(log_entry: Dict[str, Any]):
         )
 
 
+def send_notifications(ctx: RequestContext, log_entry: Dict[str, Any]):
+    """Sends the notification to Teams and Google Chat concurrently."""
+    senders = [send_teams_notification, send_google_chat_notification]
+    with ThreadPoolExecutor(max_workers=len(senders)) as executor:
+        list(executor.map(lambda send: send(ctx, log_entry), senders))
+
+
 def main(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """Main function that processes a list of tasks and updates their subtasks."""
-    global data_dsr
+    ctx = RequestContext(lambda_name=LAMBDA_NAME)
     log_event(
+        ctx,
         "info",
         "main",
         "started",
@@ -430,33 +669,43 @@ def main(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     )
 
     try:
-        data_dsr = json.loads(event["data"].replace("'", '"'))
-    except (KeyError, json.JSONDecodeError) as e:
-        log_event("error", "main", "error", message=str(e))
+        data_dsr = parse_event_data(event["data"])
+    except (KeyError, ValueError, SyntaxError) as e:
+        log_event(ctx, "error", "main", "error", message=str(e))
         return {
             "statusCode": 400,
             "body": json.dumps({"message": "Invalid input data", "error": str(e)}),
         }
 
     try:
-        data_dsr["lambda_name"] = os.getenv(
-            "AWS_LAMBDA_FUNCTION_NAME", "default_lambda"
-        )
-
-        if "uat" in (data_dsr["sm"].replace("{type}", "dsr")):
-            data_dsr["enviroment"] = "UAT"
+        sm_dsr = data_dsr["sm"].replace("{type}", "dsr")
+        if "uat" in sm_dsr:
+            enviroment = "UAT"
         else:
-            data_dsr["enviroment"] = "PROD"
+            enviroment = "PROD"
+
+        ctx = RequestContext(
+            lambda_name=LAMBDA_NAME,
+            enviroment=enviroment,
+            form_title=data_dsr.get("dsp_form_title", "unknown"),
+            ticket_id=data_dsr.get("ticketId", "unknown"),
+            task_subtask=data_dsr["task_subtask"],
+        )
+        ctx.teams_template = build_teams_template(ctx)
+        ctx.google_chat_template = build_google_chat_template(ctx)
 
-        secret_path_token = (data_dsr["sm"].replace("{type}", "dsr")) + "token"
+        secret_path_token = sm_dsr + "token"
         secret_path_channel = (data_dsr["sm"].replace("{type}", "global")) + "channel"
 
-        secret_data_channel = get_secret(secret_path_channel)
-        secret_data_token = get_secret(secret_path_token)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            future_channel = executor.submit(get_secret, ctx, secret_path_channel)
+            future_token = executor.submit(get_secret, ctx, secret_path_token)
+            secret_data_channel = future_channel.result()
+            secret_data_token = future_token.result()
 
-        data_dsr["googleChat"] = secret_data_channel.get("googleChat")
-        data_dsr["microsoftTeams"] = secret_data_channel.get("microsoftTeams")
-        data_dsr["secrets_header"] = {
+        ctx.google_chat = secret_data_channel.get("googleChat")
+        ctx.microsoft_teams = secret_data_channel.get("microsoftTeams")
+        ctx.secrets_header = {
             "X-API-KEY": secret_data_token.get("X-API-KEY"),
             "X-API-SECRET": secret_data_token.get("X-API-SECRET"),
             "X-TIDENT": secret_data_token.get("X-TIDENT"),
@@ -465,14 +714,14 @@ def main(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     except RuntimeError as e:
         return {"statusCode": 401, "body": json.dumps({"message": str(e)})}
 
-    result = process_subtasks()
+    result = process_subtasks(ctx)
     if result:
         return {
             "statusCode": 200,
             "body": json.dumps(
                 {
                     "message": "All subtasks processed successfully.",
-                    "dsr_id": data_dsr["ticketId"],
+                    "dsr_id": ctx.ticket_id,
                 }
             ),
         }
@@ -482,7 +731,7 @@ def main(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
             "body": json.dumps(
                 {
                     "message": "Failed to process the DSR. Notifications sent.",
-                    "dsr_id": data_dsr["ticketId"],
+                    "dsr_id": ctx.ticket_id,
                 }
             ),
         }